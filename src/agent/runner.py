@@ -1,24 +1,38 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import importlib
+import importlib.util
+import logging
+import secrets
 import time
-import uuid
 
+from contextlib import aclosing
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Callable, Dict, Final, List, Optional, Tuple
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APIError, APIStatusError, APITimeoutError, RateLimitError
 
 from src.app.utils.logger import get_logger
-from src.tools.search_kb import search_kb
-from src.tools.create_tickets import create_ticket
-from src.tools.followup import schedule_followup
+from src.app.utils import serialization
 from src.app.core.config import get_settings
 
 logger = get_logger("agent.runner")
 
 settings = get_settings()
 
+# Shared client and connection pool, created at startup (or on first use) and reused by every request
+_client: Optional[AsyncOpenAI] = None
+_http_client: Optional[httpx.AsyncClient] = None
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+# HTTP/2 multiplexes the turns of concurrent tool loops over one connection; needs the optional h2 package
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+# First turns currently in flight, keyed by (model, user_text); identical concurrent requests share one
+_inflight_first_turns: Dict[Tuple[str, str], asyncio.Future] = {}
+
 
 class UpstreamModelError(RuntimeError):
     """
@@ -40,144 +54,373 @@ class ToolIterationLimitError(RuntimeError):
         self.max_iterations = max_iterations
 
 
-def _system_prompt(language: Optional[str]) -> str:
-    lang_line = ""
-    if language:
-        lang_line = f"- Respond in this language if possible: {language}\n"
-
-    return (
-        "You are a reliable internal agent router for Flyboard.\n"
-        "You must decide when to use tools and when to answer from the KB.\n"
-        "Rules:\n"
-        "- Do NOT browse the web. Use only the local knowledge base via tools.\n"
-        "- If the KB doesn't contain the information, say you don't know and offer to create a ticket.\n"
-        f"{lang_line}"
-        "- When the user asks to open a ticket or schedule follow-up, use the tools.\n"
-        "- Be concise and accurate.\n"
-        "- Always end with a concrete checklist and a recommended next action.\n"
-        "- Do not ask the user questions unless required to proceed.\n"
-        "CITATIONS:"
-        "- If you use information from the knowledge base, cite the source inline using the KB id in square brackets, e.g. [KB-006]."
-        "- Only cite KB entries that actually appear in tool results."
-    )
-
-def _tool_definitions() -> List[dict]:
-    """
-    JSON schema tool definitions for OpenAI Responses API tool calling. :contentReference[oaicite:5]{index=5}
-    """
-    return [
-        {
-            "type": "function",
-            "name": "search_kb",
-            "description": "Search the internal knowledge base for relevant entries.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string"},
-                    "top_k": {"type": "integer", "default": 5},
-                    "filters": {
-                        "type": "object",
-                        "properties": {
-                            "audience": {"type": "string", "enum": ["internal", "customer"]},
-                            "tags": {"type": "array", "items": {"type": "string"}}
-                        },
-                        "additionalProperties": False,
+# Kept byte-identical across requests and turns so the upstream prompt cache can reuse it;
+# per-request details (language, customer_id) go into the user message instead.
+_STATIC_SYSTEM_PROMPT: Final[str] = (
+    "You are a reliable internal agent router for Flyboard.\n"
+    "You must decide when to use tools and when to answer from the KB.\n"
+    "Rules:\n"
+    "- Do NOT browse the web. Use only the local knowledge base via tools.\n"
+    "- If the KB doesn't contain the information, say you don't know and offer to create a ticket.\n"
+    "- If the user message starts with a [respond in <language> if possible] note, respond in that language if possible.\n"
+    "- When the user asks to open a ticket or schedule follow-up, use the tools.\n"
+    "- Be concise and accurate.\n"
+    "- Always end with a concrete checklist and a recommended next action.\n"
+    "- Do not ask the user questions unless required to proceed.\n"
+    "CITATIONS:"
+    "- If you use information from the knowledge base, cite the source inline using the KB id in square brackets, e.g. [KB-006]."
+    "- Only cite KB entries that actually appear in tool results."
+)
+
+# System entry of every conversation, shared across requests. Must not be mutated.
+_SYSTEM_MESSAGE: Final[Dict[str, Any]] = {
+    "role": "system",
+    "content": [{"type": "input_text", "text": _STATIC_SYSTEM_PROMPT}],
+}
+
+
+# JSON schema tool definitions for OpenAI Responses API tool calling, built once at import.
+_TOOLS: Final[List[dict]] = [
+    {
+        "type": "function",
+        "name": "search_kb",
+        "description": "Search the internal knowledge base for relevant entries.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string"},
+                "top_k": {"type": "integer", "default": 5},
+                "filters": {
+                    "type": "object",
+                    "properties": {
+                        "audience": {"type": "string", "enum": ["internal", "customer"]},
+                        "tags": {"type": "array", "items": {"type": "string"}}
                     },
+                    "additionalProperties": False,
                 },
-                "required": ["query"],
-                "additionalProperties": False,
             },
+            "required": ["query"],
+            "additionalProperties": False,
         },
-        {
-            "type": "function",
-            "name": "create_ticket",
-            "description": "Create a support ticket for the customer.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string"},
-                    "body": {"type": "string"},
-                    "priority": {"type": "string", "enum": ["low", "medium", "high"]},
-                },
-                "required": ["title", "body", "priority"],
-                "additionalProperties": False,
+    },
+    {
+        "type": "function",
+        "name": "create_ticket",
+        "description": "Create a support ticket for the customer.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string"},
+                "body": {"type": "string"},
+                "priority": {"type": "string", "enum": ["low", "medium", "high"]},
             },
+            "required": ["title", "body", "priority"],
+            "additionalProperties": False,
         },
-        {
-            "type": "function",
-            "name": "schedule_followup",
-            "description": "Schedule a follow-up with the customer.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "datetime_iso": {"type": "string", "description": "ISO-8601 datetime"},
-                    "contact": {"type": "string"},
-                    "channel": {"type": "string", "enum": ["email", "phone", "whatsapp"]},
-                },
-                "required": ["datetime_iso", "contact", "channel"],
-                "additionalProperties": False,
+    },
+    {
+        "type": "function",
+        "name": "schedule_followup",
+        "description": "Schedule a follow-up with the customer.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "datetime_iso": {"type": "string", "description": "ISO-8601 datetime"},
+                "contact": {"type": "string"},
+                "channel": {"type": "string", "enum": ["email", "phone", "whatsapp"]},
             },
+            "required": ["datetime_iso", "contact", "channel"],
+            "additionalProperties": False,
         },
-    ]
+    },
+]
+
+
+# Pre-serialized request fragments for the raw HTTP path (OPENAI_RAW_HTTP)
+_TOOLS_JSON: Final[bytes] = serialization.dumps_bytes(_TOOLS)
+_SYSTEM_MESSAGE_JSON: Final[bytes] = serialization.dumps_bytes(_SYSTEM_MESSAGE)
+
+
+# Tool name -> (module, function, read_only). Adding a tool is one entry here plus its schema in _TOOLS.
+# Only read-only tools start while the turn is still streaming: a running thread cannot be
+# cancelled, so a side effect started early would survive a turn that then fails.
+_TOOL_MODULES: Final[Dict[str, Tuple[str, str, bool]]] = {
+    "search_kb": ("src.tools.search_kb", "search_kb", True),
+    "create_ticket": ("src.tools.create_tickets", "create_ticket", False),
+    "schedule_followup": ("src.tools.followup", "schedule_followup", False),
+}
+
+# Dispatch table, filled on first use so workers don't load the KB or open tool files
+# until a request actually needs them
+_TOOL_TABLE: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+
+def _resolve_tool(name: str) -> Callable[..., Dict[str, Any]]:
+    target = _TOOL_MODULES.get(name)
+    if target is None:
+        raise ValueError(f"Unknown tool: {name}")
+    module_name, attr, _ = target
+    fn = _TOOL_TABLE[name] = getattr(importlib.import_module(module_name), attr)
+    return fn
 
 
 def _execute_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     """
     Executes server-side tools.
     """
-    if name == "search_kb":
-        return search_kb(**args)
-    if name == "create_ticket":
-        return create_ticket(**args)
-    if name == "schedule_followup":
-        return schedule_followup(**args)
-    raise ValueError(f"Unknown tool: {name}")
+    fn = _TOOL_TABLE.get(name) or _resolve_tool(name)
+    return fn(**args)
+
+
+def get_client() -> AsyncOpenAI:
+    """
+    Returns the shared OpenAI client, creating it on first use.
+    Raises ValueError if OPENAI_API_KEY is not configured.
+    """
+    global _client, _http_client
+
+    if _client is None:
+        api_key = settings.OPENAI_API_KEY
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY is not configured")
+        _http_client = httpx.AsyncClient(http2=_HTTP2, limits=_HTTP_LIMITS)
+        _client = AsyncOpenAI(api_key=api_key, http_client=_http_client)
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _http_client
+
+    if _client is not None:
+        await _client.close()
+        _client = None
+        _http_client = None
 
 
 def _make_trace_id() -> str:
-    # Simple unique ID generator for tracing
-    return f"trace_{uuid.uuid4().hex}"
+    # Simple unique ID generator for tracing (same 128 bits as uuid4().hex, without the UUID object)
+    return "trace_" + secrets.token_hex(16)
 
 
-def _extract_text_from_response(resp: Any) -> str:
+def _parse_response(resp: Any) -> Tuple[List[Tuple[str, str, str]], str]:
     """
-    Extracts text content from OpenAI response objects.
+    Extracts function calls and text content from OpenAI response objects in one pass.
+    Returns (calls, text) where calls is a list of (call_id, name, arguments_json_string)
     """
     # Common pattern: resp.output contains items; message item has .content list with text chunks.
-    output = getattr(resp, "output", None) or []
+    _ga = getattr
+    calls: List[Tuple[str, str, str]] = []
     texts: List[str] = []
 
-    for item in output:
-        if getattr(item, "type", None) == "message":
-            for c in getattr(item, "content", []):
-                t = getattr(c, "text", "")
-                if isinstance(t, str) and t.strip():
-                    texts.append(t.strip())
-    
-    return "\n".join(texts).strip()
+    for item in _ga(resp, "output", None) or ():
+        item_type = _ga(item, "type", None)
+        if item_type == "function_call":
+            call_id = _ga(item, "call_id", "")
+            name = _ga(item, "name", "")
+            if call_id and name:
+                calls.append((call_id, name, _ga(item, "arguments", "")))
+        elif item_type == "message":
+            for c in _ga(item, "content", ()):
+                t = _ga(c, "text", "")
+                if isinstance(t, str) and t:
+                    texts.append(t)
+
+    # usually a single chunk: skip the join, and strip once instead of per chunk
+    n = len(texts)
+    text = "" if n == 0 else texts[0].strip() if n == 1 else "\n".join(texts).strip()
+    return calls, text
+
+
+async def _run_tool_call(
+    call_id: str, name: str, args_json: str
+) -> Tuple[str, str, str, Dict[str, Any], Dict[str, Any], int]:
+    """
+    Parses arguments and runs one tool call off the event loop.
+    Returns (call_id, name, arguments_json_string, args, result, duration_ms)
+    """
+    try:
+        args = serialization.loads(args_json) if isinstance(args_json, str) else (args_json or {})
+        if not isinstance(args, dict):
+            raise ValueError("tool arguments must be an object")
 
+    except Exception:
+        args = {}
 
-def _extract_function_calls(resp: Any) -> List[Tuple[str, str, str]]:
+    start_tool = time.time()
+    # tools are sync and touch disk, keep them off the event loop
+    result = await asyncio.to_thread(_execute_tool, name, args)
+    duration_ms = int((time.time() - start_tool) * 1000)
+
+    return call_id, name, args_json, args, result, duration_ms
+
+
+def _start_tool_call(started: Dict[str, asyncio.Task], item: Any) -> None:
     """
-    Extracts function call records from OpenAI response objects.
-    Returns list of (call_id, name, arguments_json_string)
+    Starts executing a finished function_call output item of a read-only tool, once per call_id.
+    Side-effecting tools wait for the terminal event and run from the parsed response.
     """
-    calls: List[Tuple[str, str, str]] = []
-    output = getattr(resp, "output", None) or []
+    if getattr(item, "type", None) != "function_call":
+        return
+    call_id = getattr(item, "call_id", "")
+    name = getattr(item, "name", "")
+    target = _TOOL_MODULES.get(name)
+    if call_id and target is not None and target[2] and call_id not in started:
+        started[call_id] = asyncio.create_task(
+            _run_tool_call(call_id, name, getattr(item, "arguments", ""))
+        )
+
+
+def _to_namespace(value: Any) -> Any:
+    """
+    Converts decoded JSON into attribute-access objects, matching what the SDK returns.
+    """
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(v) for v in value]
+    return value
 
-    for item in output:
-        if getattr(item, "type", None) == "function_call":
-            call_id = getattr(item, "call_id", "")
-            name = getattr(item, "name", "")
-            arguments = getattr(item, "arguments", "")
 
-            if call_id and name:
-                calls.append((call_id, name, arguments))
-    
-    return calls
+def _build_request_body(request_kwargs: Dict[str, Any]) -> bytes:
+    """
+    Builds the streaming /responses request body, splicing in the pre-serialized
+    tool definitions and system message instead of encoding them on every call.
+    """
+    items = b",".join(
+        _SYSTEM_MESSAGE_JSON if m is _SYSTEM_MESSAGE else serialization.dumps_bytes(m)
+        for m in request_kwargs["input"]
+    )
+    extra = {k: v for k, v in request_kwargs.items() if k not in ("input", "tools")}
+    extra["stream"] = True
+    extra_json = serialization.dumps_bytes(extra)
+    tools_json = _TOOLS_JSON if request_kwargs["tools"] is _TOOLS else serialization.dumps_bytes(request_kwargs["tools"])
+
+    return b'{"input":[' + items + b'],"tools":' + tools_json + b"," + extra_json[1:]
+
+
+async def _iter_raw_stream_events(client: AsyncOpenAI, request_kwargs: Dict[str, Any]) -> AsyncGenerator[Any, None]:
+    """
+    Posts one streaming turn straight to the Responses endpoint over the shared HTTP client
+    and yields the server-sent events, skipping the SDK's request/response model layer.
+    Unlike the SDK path there are no automatic retries: a 429/5xx fails the turn.
+    """
+    http_client = _http_client
+    if http_client is None:
+        raise ValueError("OPENAI_RAW_HTTP requires the shared client from get_client()")
+
+    # the SDK's own default headers (auth, OpenAI-Organization / OpenAI-Project, user agent), set to
+    # accept the event stream instead of JSON
+    headers = {k: v for k, v in client.default_headers.items() if isinstance(v, str)}
+    headers["Accept"] = "text/event-stream"
+    try:
+        async with http_client.stream(
+            "POST",
+            client.base_url.join("responses"),
+            content=_build_request_body(request_kwargs),
+            headers=headers,
+            timeout=client.timeout,
+        ) as r:
+            if r.status_code >= 400:
+                await r.aread()
+                try:
+                    body = serialization.loads(r.content)
+                except ValueError:
+                    body = None
+                raise APIStatusError(f"Error code: {r.status_code}", response=r, body=body)
+
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    event = serialization.loads(line[5:])
+                except ValueError as e:
+                    raise APIError("Responses stream sent invalid JSON", r.request, body=None) from e
+                event_type = event.get("type")
+                if event_type == "error" or event_type == "response.failed":
+                    raise APIError(f"Responses stream error: {event_type}", r.request, body=event)
+                yield event
+    except httpx.TimeoutException as e:
+        raise APITimeoutError(request=e.request) from e
+    except httpx.TransportError as e:
+        raise APIConnectionError(request=e.request) from e
+
+
+async def _stream_turn(
+    client: AsyncOpenAI, request_kwargs: Dict[str, Any], dispatch_tools: bool
+) -> Tuple[Any, Dict[str, asyncio.Task]]:
+    """
+    Streams one model turn. When dispatch_tools is set, each function call starts
+    executing as soon as its output item is done instead of after the whole response.
+    Returns (final_response, started tool tasks by call_id)
+    """
+    started: Dict[str, asyncio.Task] = {}
+    resp: Any = None
+    try:
+        if settings.OPENAI_RAW_HTTP:
+            async with aclosing(_iter_raw_stream_events(client, request_kwargs)) as events:
+                async for event in events:
+                    event_type = event.get("type")
+                    if event_type == "response.output_item.done":
+                        if dispatch_tools:
+                            _start_tool_call(started, _to_namespace(event.get("item") or {}))
+                    elif event_type in ("response.completed", "response.incomplete"):
+                        resp = _to_namespace(event.get("response") or {})
+        else:
+            async with client.responses.stream(**request_kwargs) as stream:
+                async for event in stream:
+                    if event.type == "response.output_item.done":
+                        if dispatch_tools:
+                            _start_tool_call(started, event.item)
+                    elif event.type in ("response.completed", "response.incomplete"):
+                        # not get_final_response(): it only exists after response.completed, and an
+                        # incomplete turn (max_output_tokens, content filter) still carries its partial output
+                        resp = event.response
+
+        if resp is None:
+            # an upstream failure like any other: surfaces as UpstreamModelError (502), not a runner error
+            raise APIError(
+                "Responses stream ended without a final response",
+                httpx.Request("POST", client.base_url.join("responses")),
+                body=None,
+            )
+    except BaseException:
+        for task in started.values():
+            task.cancel()
+        raise
+
+    return resp, started
+
+
+async def _coalesced_first_turn(
+    client: AsyncOpenAI, request_kwargs: Dict[str, Any], dispatch_tools: bool, key: Tuple[str, str]
+) -> Tuple[Any, Dict[str, asyncio.Task], bool]:
+    """
+    Runs the first turn, sharing one upstream call between identical concurrent requests.
+    The input of a first turn is fully determined by the key since the system prompt is static.
+    Followers get the leader's final response and run their own tools from it.
+    Returns (final_response, started tool tasks by call_id, shared)
+    """
+    pending = _inflight_first_turns.get(key)
+    if pending is not None:
+        resp = await asyncio.shield(pending)
+        if resp is not None:
+            return resp, {}, True
+        # leader failed; make our own call and surface our own error if any
+        resp, started = await _stream_turn(client, request_kwargs, dispatch_tools)
+        return resp, started, False
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight_first_turns[key] = fut
+    resp = None
+    try:
+        resp, started = await _stream_turn(client, request_kwargs, dispatch_tools)
+        return resp, started, False
+    finally:
+        del _inflight_first_turns[key]
+        fut.set_result(resp)
 
 
-def run_task(task: str, customer_id: Optional[str] = None, language: Optional[str] = None) -> Dict[str, Any]:
+async def run_task(task: str, customer_id: Optional[str] = None, language: Optional[str] = None) -> Dict[str, Any]:
     """
     Orchestrates the tool loop:
     - call OpenAI Responses API
@@ -199,48 +442,97 @@ def run_task(task: str, customer_id: Optional[str] = None, language: Optional[st
     user_text = task.strip()
     if customer_id:
         user_text = f"{user_text}\n\n(customer_id: {customer_id})"
-    
-    system_prompt = _system_prompt(language)
+    if language:
+        user_text = f"[respond in {language} if possible]\n{user_text}"
+
     messages: List[Dict[str, Any]] = [
-        {"role": "system", "content": [{"type": "input_text", "text": system_prompt}]},
+        _SYSTEM_MESSAGE,
         {"role": "user", "content": [{"type": "input_text", "text": user_text}]},
     ]
 
-    api_key = settings.OPENAI_API_KEY
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY is not configured")
-
     model_name = settings.OPENAI_MODEL
     max_tool_iterations = settings.MAX_TOOLS_ITERATIONS
 
-    client = OpenAI(api_key=api_key)
-    tools = _tool_definitions()
+    client = _client or get_client()
+    tools = _TOOLS
+    chain_responses = settings.OPENAI_USE_PREVIOUS_RESPONSE_ID
+    coalesce = settings.AGENT_COALESCE_FIRST_TURN
+    # args/result can be large; only pay for their formatting when it will be emitted
+    trace_logs = settings.AGENT_TRACE_LOGS and logger.isEnabledFor(logging.DEBUG)
 
     logger.info("trace_id=%s model=%s start", trace_id, model_name)
 
     try:
         tool_iterations = 0
+        # When chaining, later turns only send the new tool outputs on top of previous_response_id;
+        # `messages` keeps the full conversation either way.
+        previous_response_id: Optional[str] = None
+        turn_input: List[Dict[str, Any]] = messages
 
         while True:
-            openai_calls += 1
-            if time.time() > deadline:
+            remaining = deadline - time.time()
+            if remaining <= 0:
                 raise TimeoutError(f"agent exceeded max seconds ({settings.AGENT_MAX_SECONDS})")
 
-            resp = client.responses.create(
-                model=model_name,
-                input=messages,
-                tools=tools,
-                tool_choice="auto",
-            )
-
-            calls = _extract_function_calls(resp)
+            request_kwargs: Dict[str, Any] = {
+                "model": model_name,
+                "input": turn_input,
+                "tools": tools,
+                "tool_choice": "auto",
+            }
+            if previous_response_id:
+                request_kwargs["previous_response_id"] = previous_response_id
+
+            # tools only start early while another tool iteration is still allowed
+            dispatch_tools = tool_iterations < max_tool_iterations
+            try:
+                if coalesce and tool_iterations == 0:
+                    resp, started, shared = await asyncio.wait_for(
+                        _coalesced_first_turn(client, request_kwargs, dispatch_tools, (model_name, user_text)),
+                        timeout=remaining,
+                    )
+                else:
+                    resp, started = await asyncio.wait_for(
+                        _stream_turn(client, request_kwargs, dispatch_tools),
+                        timeout=remaining,
+                    )
+                    shared = False
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"agent exceeded max seconds ({settings.AGENT_MAX_SECONDS})") from None
+            except APIStatusError as e:
+                if e.status_code != 400 or previous_response_id is None:
+                    raise
+                # previous_response_id rejected (e.g. response storage disabled for the project):
+                # retry this turn with the full conversation and stop chaining for the rest of the run
+                logger.warning("trace_id=%s previous_response_id rejected, resending full input", trace_id)
+                openai_calls += 1
+                chain_responses = False
+                previous_response_id = None
+                turn_input = messages
+                continue
+
+            if not shared:
+                openai_calls += 1
+
+            calls, final_answer = _parse_response(resp)
             if calls:
                 tool_iterations += 1
                 if tool_iterations > max_tool_iterations:
                     raise ToolIterationLimitError(trace_id=trace_id, max_iterations=max_tool_iterations)
             
-                for call_id, name, args_json in calls:
-                    messages.append(
+                results = await asyncio.gather(*[
+                    started.pop(call[0]) if call[0] in started else _run_tool_call(*call) for call in calls
+                ])
+                pending_call_msgs: List[Dict[str, Any]] = []
+                pending_output_msgs: List[Dict[str, Any]] = []
+
+                for call_id, name, args_json, args, result, duration_ms in results:
+                    tool_call_records.append({"name": name, "arguments": args, "result": result})
+                    logger.info("trace_id=%s tool=%s duration_ms=%d", trace_id, name, duration_ms)
+                    if trace_logs:
+                        logger.debug("trace_id=%s tool=%s args=%s result=%s", trace_id, name, args, result)
+
+                    pending_call_msgs.append(
                         {
                             "type": "function_call",
                             "call_id": call_id,
@@ -248,39 +540,34 @@ def run_task(task: str, customer_id: Optional[str] = None, language: Optional[st
                             "arguments": args_json,
                         }
                     )
-                    try:
-                        args = json.loads(args_json) if isinstance(args_json, str) else (args_json or {})
-                        if not isinstance(args, dict):
-                            raise ValueError("tool arguments must be an object")
-                        
-                    except Exception:
-                        args = {}
-
-                    start_tool = time.time()
-                    result = _execute_tool(name, args)
-                    duration_ms = int((time.time() - start_tool) * 1000)
-
-                    tool_call_records.append({"name": name, "arguments": args, "result": result})
-                    logger.info("trace_id=%s tool=%s duration_ms=%d", trace_id, name, duration_ms)
-                    if settings.AGENT_TRACE_LOGS:
-                        logger.debug("trace_id=%s tool=%s args=%s result=%s", trace_id, name, args, result)
-
-                    messages.append(
+                    pending_output_msgs.append(
                         {
                             "type": "function_call_output",
                             "call_id": call_id,
-                            "output": json.dumps(result, ensure_ascii=False),
+                            "output": serialization.dumps(result),
                         }
                     )
 
+                # calls first, then their outputs, mirroring how the model emitted them
+                messages.extend(pending_call_msgs)
+                messages.extend(pending_output_msgs)
+
+                response_id = getattr(resp, "id", None)
+                if chain_responses and response_id:
+                    previous_response_id = response_id
+                    turn_input = pending_output_msgs
+                else:
+                    # chaining disabled or unsupported for this run: resend everything
+                    previous_response_id = None
+                    turn_input = messages
+
                 continue 
 
-            final_answer = _extract_text_from_response(resp)
             if not final_answer:
                 final_answer = "I couldn't generate a final answer. Please try again."
             
             total_latency_ms = int((time.time() - t0) * 1000)
-            logger.info(f"trace_id={trace_id} openai_calls={openai_calls}")
+            logger.info("trace_id=%s openai_calls=%d", trace_id, openai_calls)
             return {
                 "trace_id": trace_id,
                 "final_answer": final_answer,
@@ -294,11 +581,9 @@ def run_task(task: str, customer_id: Optional[str] = None, language: Optional[st
             
     except (UpstreamModelError, ToolIterationLimitError):
         raise
-    except Exception as e:
-        msg = str(e).lower()
-        if "openai" in msg or "rate" in msg or "timeout" in msg or "responses" in msg:
-            logger.exception("trace_id=%s upstream error", trace_id)
-            raise UpstreamModelError(trace_id=trace_id, message="OpenAI request failed") from e
-
+    except (APIError, RateLimitError, APITimeoutError, APIConnectionError) as e:
+        logger.exception("trace_id=%s upstream error", trace_id)
+        raise UpstreamModelError(trace_id=trace_id, message="OpenAI request failed") from e
+    except Exception:
         logger.exception("trace_id=%s runner error", trace_id)
         raise
@@ -23,10 +23,13 @@ class Settings(BaseSettings):
     AGENT_MAX_SECONDS: int = Field(default=60)
     AGENT_TRACE_LOGS: bool = Field(default=False)
     MAX_TOOLS_ITERATIONS: int = Field(default=6)
+    AGENT_COALESCE_FIRST_TURN: bool = Field(default=True)
 
     # External keys
     OPENAI_API_KEY: str = Field(default="")
     OPENAI_MODEL: str = Field(default="gpt-4.1-mini")
+    OPENAI_USE_PREVIOUS_RESPONSE_ID: bool = Field(default=True)
+    OPENAI_RAW_HTTP: bool = Field(default=False)
 
 @lru_cache()
 def get_settings() -> Settings:
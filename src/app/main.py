@@ -6,6 +6,7 @@ from fastapi import FastAPI
 from fastapi import Request
 from contextlib import asynccontextmanager
 
+from src.agent.runner import close_client, get_client
 from src.app.core.config import get_settings
 from src.app.routes.agent import router as agent_router
 from src.app.routes.health import router as health_router
@@ -17,9 +18,11 @@ logger = get_logger(__name__, log_level=settings.LOG_LEVEL, log_file=f"{settings
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Service starting up")
+    get_client()  # fail fast on a missing OPENAI_API_KEY and open the shared connection pool
     try:
         yield
     finally:
+        await close_client()
         logger.info("Service shutting down")
 
 
@@ -39,17 +42,18 @@ def create_app() -> FastAPI:
     # ---- Middleware: basic request logging ----
     @app.middleware("http")
     async def log_requests(request: Request, call_next):
-        start = time.time()
+        start = time.perf_counter_ns()
+        response = None
         try:
             response = await call_next(request)
             return response
         finally:
-            duration_ms = int((time.time() - start) * 1000)
+            duration_ms = (time.perf_counter_ns() - start) // 1_000_000
             logger.info(
                 "%s %s -> %s (%dms)",
                 request.method,
                 request.url.path,
-                getattr(locals().get("response", None), "status_code", "NA"),
+                response.status_code if response is not None else "NA",
                 duration_ms,
             )
     
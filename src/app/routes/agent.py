@@ -17,27 +17,30 @@ router = APIRouter(
 )
 
 @router.post("/run", response_model=RunResponse)
-def run_agent(request: RunRequest) -> RunResponse:
+async def run_agent(request: RunRequest) -> RunResponse:
     """
     Endpoint to run the agent with the provided task and parameters.
     """
 
-    start_time = time.time()
+    start_time = time.perf_counter()
     try:
-        response = run_task(
+        response = await run_task(
             task=request.task,
             customer_id=request.customer_id,
             language=request.language
         )
 
         logger.info(
-            f"trace_id={response['trace_id']} task={request.task} completed in {time.time() - start_time:.2f} seconds"
+            "trace_id=%s task=%s completed in %.2f seconds",
+            response["trace_id"],
+            request.task,
+            time.perf_counter() - start_time,
         )
 
         return response
     
     except UpstreamModelError as e:
-        logger.error(f"Upstream model error trace_id {e.trace_id}")
+        logger.error("Upstream model error trace_id %s", e.trace_id)
         return JSONResponse(
             status_code=502,
             content={
@@ -0,0 +1,81 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.app.utils.files import write_all
+
+try:
+    import fcntl
+    _HAS_FLOCK = True
+except ImportError:  # not POSIX (Windows): reservations are only exclusive within this process
+    _HAS_FLOCK = False
+
+# serializes reservations between counters of this process; flock() extends that across processes
+_FILE_LOCK = threading.Lock()
+
+
+class ReservedCounter:
+    """
+    Monotonic id counter backed by a high-water mark file.
+
+    Ids are handed out from memory, in blocks reserved ahead of use: before the first id of a
+    block is issued, the end of the block is written to the file under an exclusive flock. A hard
+    crash therefore skips the unused rest of the block instead of reissuing ids, and processes
+    sharing the file (several workers) reserve disjoint blocks.
+
+    Cross-process exclusion needs POSIX flock(). Without it (Windows) the counter still works and
+    still skips ids after a crash, but only one process may use a counter file at a time.
+    """
+
+    def __init__(self, path: Path, name: str, block_size: int = 10) -> None:
+        self._path = path
+        self._name = name
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 1
+        self._end = 0  # last id of the reserved block; nothing reserved yet
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next > self._end:
+                self._reserve()
+            value = self._next
+            self._next += 1
+            return value
+
+    def close(self) -> None:
+        """Hand back the unused part of the current block if no other process reserved after it."""
+        with self._lock:
+            if self._next > self._end:
+                return
+            self._update(lambda current: self._next - 1 if current == self._end else None)
+            self._end = self._next - 1
+
+    def _reserve(self) -> None:
+        start = self._update(lambda current: current + self._block_size)
+        self._next = start + 1
+        self._end = start + self._block_size
+
+    def _update(self, new_value: Callable[[int], Optional[int]]) -> int:
+        # read-modify-write of the high-water mark under an exclusive lock; returns the old value
+        with _FILE_LOCK:
+            fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if _HAS_FLOCK:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.read(fd, 64).strip()
+                try:
+                    current = int(raw) if raw else 0
+                except ValueError:
+                    raise ValueError(f"Invalid {self._name} counter file content")
+
+                value = new_value(current)
+                if value is not None:
+                    os.ftruncate(fd, 0)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    write_all(fd, str(value).encode("ascii"))
+                    os.fsync(fd)
+                return current
+            finally:
+                os.close(fd)  # also releases the flock
@@ -0,0 +1,40 @@
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+def write_all(fd: int, data: bytes) -> None:
+    """os.write() until all of data is written (a single call may write only part of it)."""
+
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class AppendOnlyFile:
+    """
+    Lazily opened O_APPEND file descriptor. Each append() lands at the end of the file; a writer
+    that needs several write() calls for one buffer may interleave with other processes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    def _get_fd(self) -> int:
+        if self._fd is None:
+            with self._lock:
+                if self._fd is None:
+                    self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def append(self, data: bytes) -> None:
+        write_all(self._get_fd(), data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,32 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:  # optional speedup, fall back to stdlib json
+    _HAS_ORJSON = False
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj to a compact, non-ASCII-escaped JSON string."""
+
+    if _HAS_ORJSON:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize obj to compact UTF-8 encoded JSON."""
+
+    if _HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON from str or UTF-8 bytes."""
+
+    if _HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import src.tools.create_tickets as create_tickets
+from src.app.utils import files
+from src.app.utils.counter import ReservedCounter
+from src.app.utils.files import AppendOnlyFile
+
+
+@pytest.fixture()
+def tickets_module(monkeypatch, tmp_path):
+    monkeypatch.setattr(create_tickets, "_TICKET_OUTPUT_PATH", tmp_path / "tickets.jsonl")
+    monkeypatch.setattr(create_tickets, "_TICKET_COUNTER_PATH", tmp_path / "ticket_counter.txt")
+    monkeypatch.setattr(create_tickets, "_COUNTER", ReservedCounter(tmp_path / "ticket_counter.txt", "ticket"))
+    monkeypatch.setattr(create_tickets, "_TICKETS_FILE", AppendOnlyFile(tmp_path / "tickets.jsonl"))
+    yield create_tickets
+    create_tickets._shutdown()
+
+
+def _written_ids(m):
+    lines = m._TICKET_OUTPUT_PATH.read_text(encoding="utf-8").splitlines()
+    return [json.loads(line)["id"] for line in lines]
+
+
+def test_create_ticket_issues_sequential_ids_and_appends_lines(tickets_module):
+    ids = [tickets_module.create_ticket(f"title {i}", "body", "high")["ticket_id"] for i in range(12)]
+
+    assert ids == [f"TICK-{i:06d}" for i in range(1, 13)]
+    assert _written_ids(tickets_module) == ids
+    # the second block (11..20) is reserved as soon as id 11 is issued
+    assert tickets_module._TICKET_COUNTER_PATH.read_text(encoding="utf-8") == "20"
+
+
+def test_shutdown_hands_back_unused_ids(tickets_module):
+    tickets_module.create_ticket("title", "body", "low")
+    tickets_module._shutdown()
+
+    assert tickets_module._TICKET_COUNTER_PATH.read_text(encoding="utf-8") == "1"
+    assert ReservedCounter(tickets_module._TICKET_COUNTER_PATH, "ticket").next() == 2
+
+
+def test_counter_skips_ids_after_crash_instead_of_reissuing(tmp_path):
+    path = tmp_path / "ticket_counter.txt"
+    crashed = ReservedCounter(path, "ticket")
+    assert [crashed.next() for _ in range(3)] == [1, 2, 3]
+
+    # no close(): the process died with the rest of the block unused
+    assert ReservedCounter(path, "ticket").next() == 11
+
+
+def test_counters_sharing_a_file_reserve_disjoint_blocks(tmp_path):
+    path = tmp_path / "ticket_counter.txt"
+    first, second = ReservedCounter(path, "ticket"), ReservedCounter(path, "ticket")
+
+    issued = [first.next(), second.next(), first.next(), second.next()]
+    assert issued == [1, 11, 2, 12]
+
+    # only the block reserved last can be handed back
+    first.close()
+    second.close()
+    assert path.read_text(encoding="utf-8") == "12"
+
+
+def test_counter_without_flock_still_reserves_blocks(tmp_path, monkeypatch):
+    from src.app.utils import counter
+
+    # platforms without fcntl (Windows) fall back to the process-local lock
+    monkeypatch.setattr(counter, "_HAS_FLOCK", False)
+    path = tmp_path / "ticket_counter.txt"
+    first, second = ReservedCounter(path, "ticket"), ReservedCounter(path, "ticket")
+
+    assert [first.next(), second.next(), first.next()] == [1, 11, 2]
+    assert ReservedCounter(path, "ticket").next() == 21
+
+
+def test_counter_rejects_invalid_file(tmp_path):
+    path = tmp_path / "ticket_counter.txt"
+    path.write_text("not a number", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        ReservedCounter(path, "ticket").next()
+
+
+def test_create_ticket_retries_short_writes(tickets_module, monkeypatch):
+    real_write = files.os.write
+    monkeypatch.setattr(files.os, "write", lambda fd, data: real_write(fd, bytes(data[:7])))
+
+    tickets_module.create_ticket("title", "a longer body " * 50, "medium")
+
+    assert _written_ids(tickets_module) == ["TICK-000001"]
@@ -0,0 +1,104 @@
+import json
+import queue
+from datetime import datetime
+
+import pytest
+
+import src.tools.followup as followup
+from src.app.utils.counter import ReservedCounter
+from src.app.utils.files import AppendOnlyFile
+from src.tools.followup import _validate_iso8601
+
+
+@pytest.fixture()
+def followup_module(monkeypatch, tmp_path):
+    monkeypatch.setattr(followup, "_FOLLOWUP_OUTPUT_PATH", tmp_path / "followups.jsonl")
+    monkeypatch.setattr(followup, "_FOLLOEUP_COUNTER_PATH", tmp_path / "followup_counter.txt")
+    monkeypatch.setattr(followup, "_COUNTER", ReservedCounter(tmp_path / "followup_counter.txt", "followup"))
+    monkeypatch.setattr(followup, "_FOLLOWUPS_FILE", AppendOnlyFile(tmp_path / "followups.jsonl"))
+    monkeypatch.setattr(followup, "_write_q", queue.Queue())
+    monkeypatch.setattr(followup, "_writer", None)
+    yield followup
+    followup._shutdown()
+
+
+@pytest.mark.parametrize("value", [
+    "2025-03-04T10:30:00",
+    "2025-03-04T10:30:00Z",
+    "2025-03-04T10:30:00+02:00",
+    "2025-03-04T10:30:00.123456-05:30",
+    "2025-03-04T10:30:00.000000",
+    "2025-03-04T10:30:00-00:00",
+    "2025-03-04T10:30:00.5",
+    "2024-02-29T23:59:59",
+    "2025-03-04 10:30",
+    "2025-03-04",
+])
+def test_validate_iso8601_matches_fromisoformat(value):
+    expected = datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+    assert _validate_iso8601(f" {value} ") == expected
+
+
+@pytest.mark.parametrize("value", [
+    "2023-02-29T10:00:00",
+    "2025-13-01T10:00:00",
+    "2025-03-04T24:00:00",
+    "2025-03-04T10:30:00+24:00",
+    "next tuesday",
+    "   ",
+])
+def test_validate_iso8601_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        _validate_iso8601(value)
+
+
+def test_schedule_followup_lines_are_written_in_the_background(followup_module):
+    ids = [
+        followup_module.schedule_followup("2025-03-04T10:30:00Z", f"user{i}@example.com", "email")["followup_id"]
+        for i in range(25)
+    ]
+    followup_module._write_q.join()
+
+    lines = followup_module._FOLLOWUP_OUTPUT_PATH.read_text(encoding="utf-8").splitlines()
+    written = [json.loads(line) for line in lines]
+    assert [f["id"] for f in written] == ids
+    assert written[0]["datetime_iso"] == "2025-03-04T10:30:00+00:00"
+
+
+def test_shutdown_drains_queue_and_persists_counter(followup_module):
+    followup_module.schedule_followup("2025-03-04T10:30:00", "+15550100", "phone")
+    followup_module._shutdown()
+
+    assert not followup_module._writer.is_alive()
+    assert len(followup_module._FOLLOWUP_OUTPUT_PATH.read_text(encoding="utf-8").splitlines()) == 1
+    assert followup_module._FOLLOEUP_COUNTER_PATH.read_text(encoding="utf-8") == "1"
+
+
+def test_followup_ids_are_not_reissued_after_crash(followup_module):
+    followup_module.schedule_followup("2025-03-04T10:30:00", "+15550100", "phone")
+
+    # a new process on the same counter file, without the crashed one handing ids back
+    restarted = ReservedCounter(followup_module._FOLLOEUP_COUNTER_PATH, "followup")
+    assert restarted.next() == 11
+
+
+def test_failed_followup_writes_are_retried_not_dropped(followup_module, monkeypatch):
+    real_append = followup_module._FOLLOWUPS_FILE.append
+    failures = [OSError("disk full")]
+
+    def flaky_append(data):
+        if failures:
+            raise failures.pop()
+        real_append(data)
+
+    monkeypatch.setattr(followup_module._FOLLOWUPS_FILE, "append", flaky_append)
+    monkeypatch.setattr(followup_module, "_RETRY_DELAY", 0.01)
+
+    ids = [
+        followup_module.schedule_followup("2025-03-04T10:30:00", f"user{i}@example.com", "email")["followup_id"]
+        for i in range(3)
+    ]
+    followup_module._write_q.join()
+
+    lines = followup_module._FOLLOWUP_OUTPUT_PATH.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ids
@@ -1,5 +1,6 @@
 import json
 import sys
+import asyncio
 import importlib
 from dataclasses import dataclass
 from typing import List, Any
@@ -12,7 +13,7 @@ import pytest
 # Mock OpenAI Responses API objects
 # -----------------------
 def _msg(text: str):
-    # Matches what _extract_text_from_response() expects
+    # Matches what _parse_response() expects for message items
     return SimpleNamespace(
         type="message",
         content=[SimpleNamespace(text=text)],
@@ -20,7 +21,7 @@ def _msg(text: str):
 
 
 def _call(call_id: str, name: str, args: dict):
-    # Matches what _extract_function_calls() expects
+    # Matches what _parse_response() expects for function_call items
     return SimpleNamespace(
         type="function_call",
         call_id=call_id,
@@ -29,18 +30,47 @@ def _call(call_id: str, name: str, args: dict):
     )
 
 
+class _MockStream:
+    """
+    Mimics the AsyncResponseStream returned by client.responses.stream
+    """
+    def __init__(self, response):
+        self._response = response
+
+    async def __aenter__(self):
+        if isinstance(self._response, Exception):
+            raise self._response
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        await asyncio.sleep(0)  # yield like a real network read
+        for item in getattr(self._response, "output", []):
+            yield SimpleNamespace(type="response.output_item.done", item=item)
+        yield SimpleNamespace(type="response.completed", response=self._response)
+
+    async def get_final_response(self):
+        return self._response
+
+
 class _MockResponses:
     """
-    Mimics client.responses.create
+    Mimics AsyncOpenAI client.responses.stream
     """
     def __init__(self, sequence):
         self._sequence = list(sequence)
         self.calls = []
     
 
-    def create(self, **kwargs):
-        self.calls.append(kwargs)
-        return self._sequence.pop(0)
+    def stream(self, **kwargs):
+        # snapshot the input: the runner keeps appending to its message list
+        self.calls.append({**kwargs, "input": list(kwargs["input"])})
+        return _MockStream(self._sequence.pop(0))
     
 
 class _MockOpenAIClient:
@@ -56,7 +86,11 @@ def runner_module(monkeypatch):
     monkeypatch.setenv("MAX_TOOLS_ITERATIONS", "6")
     monkeypatch.setenv("AGENT_TRACE_LOGS", "false")
 
-    m = importlib.import_module("src.agent.runner")
+    import src.app.core.config as config
+    config.get_settings.cache_clear()
+
+    m = importlib.reload(importlib.import_module("src.agent.runner"))
+    monkeypatch.setattr(m, "_client", None)
     return m
 
 
@@ -68,9 +102,9 @@ def test_run_task_basic(runner_module, monkeypatch):
         SimpleNamespace(output=[_msg("Hello, world!")])
     ])
 
-    monkeypatch.setattr(runner_module, "OpenAI", lambda api_key: test_client)
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
 
-    module_output = runner_module.run_task("hello")
+    module_output = asyncio.run(runner_module.run_task("hello"))
     assert module_output["final_answer"] == "Hello, world!"
     assert module_output["tool_calls"] == []
     assert module_output["metrics"]["openai_calls"] == 1
@@ -82,7 +116,7 @@ def test_run_task_basic_with_tool(runner_module, monkeypatch):
         SimpleNamespace(output=[_msg("final answer")]),
     ])
 
-    monkeypatch.setattr(runner_module, "OpenAI", lambda api_key: test_client)
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
 
     monkeypatch.setattr(
         runner_module,
@@ -90,7 +124,7 @@ def test_run_task_basic_with_tool(runner_module, monkeypatch):
         lambda name, args: {"results": [{"id": "KB-001"}]},
     )
 
-    module_output = runner_module.run_task("tell me about crm")
+    module_output = asyncio.run(runner_module.run_task("tell me about crm"))
 
     assert module_output["final_answer"] == "final answer"
     assert len(module_output["tool_calls"]) == 1
@@ -111,3 +145,329 @@ def test_run_task_basic_with_tool(runner_module, monkeypatch):
 
 
 
+
+
+def test_run_task_parallel_tool_calls_keep_call_order(runner_module, monkeypatch):
+    test_client = _MockOpenAIClient(sequence=[
+        SimpleNamespace(output=[
+            _call("call_1", "search_kb", {"query": "crm"}),
+            _call("call_2", "schedule_followup", {"datetime_iso": "2025-01-01T10:00:00Z", "contact": "a@b.c", "channel": "email"}),
+        ]),
+        SimpleNamespace(output=[_msg("done")]),
+    ])
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+
+    monkeypatch.setattr(
+        runner_module,
+        "_execute_tool",
+        lambda name, args: {"tool": name},
+    )
+
+    module_output = asyncio.run(runner_module.run_task("crm and followup"))
+
+    assert [c["name"] for c in module_output["tool_calls"]] == ["search_kb", "schedule_followup"]
+
+    second_input = test_client.responses.calls[1]["input"]
+    tool_items = [(m["type"], m["call_id"]) for m in second_input if m.get("type")]
+    assert tool_items == [
+        ("function_call", "call_1"),
+        ("function_call", "call_2"),
+        ("function_call_output", "call_1"),
+        ("function_call_output", "call_2"),
+    ]
+
+
+def test_run_task_language_keeps_system_prompt_static(runner_module, monkeypatch):
+    test_client = _MockOpenAIClient(sequence=[
+        SimpleNamespace(output=[_msg("hola")]),
+        SimpleNamespace(output=[_msg("hello")]),
+    ])
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+
+    asyncio.run(runner_module.run_task("hello", language="es"))
+    asyncio.run(runner_module.run_task("hello"))
+
+    first_input, second_input = (c["input"] for c in test_client.responses.calls)
+    assert first_input[0] == second_input[0]
+    assert first_input[1]["content"][0]["text"].startswith("[respond in es if possible]\n")
+    assert second_input[1]["content"][0]["text"] == "hello"
+
+
+def test_run_task_chains_turns_with_previous_response_id(runner_module, monkeypatch):
+    test_client = _MockOpenAIClient(sequence=[
+        SimpleNamespace(id="resp_1", output=[_call("call_1", "search_kb", {"query": "crm"})]),
+        SimpleNamespace(id="resp_2", output=[_msg("final answer")]),
+    ])
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+    monkeypatch.setattr(runner_module.settings, "OPENAI_USE_PREVIOUS_RESPONSE_ID", True)
+    monkeypatch.setattr(
+        runner_module,
+        "_execute_tool",
+        lambda name, args: {"results": [{"id": "KB-001"}]},
+    )
+
+    module_output = asyncio.run(runner_module.run_task("tell me about crm"))
+    assert module_output["final_answer"] == "final answer"
+
+    first_call, second_call = test_client.responses.calls
+    assert "previous_response_id" not in first_call
+    assert second_call["previous_response_id"] == "resp_1"
+    assert [m["type"] for m in second_call["input"]] == ["function_call_output"]
+    assert second_call["input"][0]["call_id"] == "call_1"
+
+
+def test_run_task_falls_back_to_full_input_when_chaining_is_rejected(runner_module, monkeypatch):
+    import httpx
+    from openai import BadRequestError
+
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    rejected = BadRequestError(
+        "Previous response not found", response=httpx.Response(400, request=request), body=None
+    )
+    test_client = _MockOpenAIClient(sequence=[
+        SimpleNamespace(id="resp_1", output=[_call("call_1", "search_kb", {"query": "crm"})]),
+        rejected,
+        SimpleNamespace(id="resp_2", output=[_call("call_2", "search_kb", {"query": "billing"})]),
+        SimpleNamespace(id="resp_3", output=[_msg("final answer")]),
+    ])
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+    monkeypatch.setattr(runner_module.settings, "OPENAI_USE_PREVIOUS_RESPONSE_ID", True)
+    monkeypatch.setattr(
+        runner_module,
+        "_execute_tool",
+        lambda name, args: {"results": [{"id": "KB-001"}]},
+    )
+
+    module_output = asyncio.run(runner_module.run_task("tell me about crm"))
+    assert module_output["final_answer"] == "final answer"
+    assert module_output["metrics"]["openai_calls"] == 4
+
+    _, chained, retried, after = test_client.responses.calls
+    assert chained["previous_response_id"] == "resp_1"
+    # the rejected turn is resent with the whole conversation, and later turns no longer chain
+    assert "previous_response_id" not in retried
+    assert [m.get("type", m.get("role")) for m in retried["input"]] == ["system", "user", "function_call", "function_call_output"]
+    assert "previous_response_id" not in after
+    assert len(after["input"]) == 6
+
+
+def test_run_task_iteration_limit_does_not_start_tools(runner_module, monkeypatch):
+    test_client = _MockOpenAIClient(sequence=[
+        SimpleNamespace(output=[_call("call_1", "create_ticket", {"title": "t", "body": "b", "priority": "low"})]),
+    ])
+    executed = []
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+    monkeypatch.setattr(runner_module.settings, "MAX_TOOLS_ITERATIONS", 0)
+    monkeypatch.setattr(
+        runner_module,
+        "_execute_tool",
+        lambda name, args: executed.append(name) or {},
+    )
+
+    with pytest.raises(runner_module.ToolIterationLimitError):
+        asyncio.run(runner_module.run_task("open a ticket"))
+    assert executed == []
+
+
+def test_run_task_coalesces_identical_concurrent_first_turns(runner_module, monkeypatch):
+    test_client = _MockOpenAIClient(sequence=[
+        SimpleNamespace(output=[_msg("shared answer")]),
+    ])
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+    monkeypatch.setattr(runner_module.settings, "AGENT_COALESCE_FIRST_TURN", True)
+
+    async def _run_both():
+        return await asyncio.gather(
+            runner_module.run_task("what is flyboard?"),
+            runner_module.run_task("what is flyboard?"),
+        )
+
+    first, second = asyncio.run(_run_both())
+
+    assert len(test_client.responses.calls) == 1
+    assert first["final_answer"] == second["final_answer"] == "shared answer"
+    assert first["trace_id"] != second["trace_id"]
+    assert sorted([first["metrics"]["openai_calls"], second["metrics"]["openai_calls"]]) == [0, 1]
+
+
+def test_run_task_openai_error_maps_to_upstream_error(runner_module, monkeypatch):
+    import httpx
+    from openai import APIConnectionError
+
+    class _FailingResponses:
+        def stream(self, **kwargs):
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: SimpleNamespace(responses=_FailingResponses()))
+
+    with pytest.raises(runner_module.UpstreamModelError):
+        asyncio.run(runner_module.run_task("hello"))
+
+
+def test_run_task_tool_error_is_not_upstream_error(runner_module, monkeypatch):
+    test_client = _MockOpenAIClient(sequence=[
+        SimpleNamespace(output=[_call("call_1", "search_kb", {"query": "crm"})]),
+    ])
+
+    def _raise(name, args):
+        raise RuntimeError("kb read timeout")
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+    monkeypatch.setattr(runner_module, "_execute_tool", _raise)
+
+    with pytest.raises(RuntimeError, match="kb read timeout"):
+        asyncio.run(runner_module.run_task("tell me about crm"))
+
+
+def test_run_task_raw_http_stream(runner_module, monkeypatch):
+    import httpx
+    from openai import AsyncOpenAI
+
+    bodies = []
+    headers = []
+    turns = [
+        [
+            {"type": "response.output_item.done", "item": {"type": "function_call", "call_id": "call_1", "name": "search_kb", "arguments": json.dumps({"query": "crm"})}},
+            {"type": "response.completed", "response": {"id": "resp_1", "output": [{"type": "function_call", "call_id": "call_1", "name": "search_kb", "arguments": json.dumps({"query": "crm"})}]}},
+        ],
+        [
+            {"type": "response.completed", "response": {"id": "resp_2", "output": [{"type": "message", "content": [{"type": "output_text", "text": "raw answer"}]}]}},
+        ],
+    ]
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        headers.append(request.headers)
+        sse = "".join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in turns.pop(0))
+        return httpx.Response(200, text=sse, headers={"content-type": "text/event-stream"})
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(runner_module, "_http_client", http_client)
+    monkeypatch.setattr(runner_module, "_client", AsyncOpenAI(
+        api_key="test-key", organization="org-test", project="proj-test", http_client=http_client,
+    ))
+    monkeypatch.setattr(runner_module.settings, "OPENAI_RAW_HTTP", True)
+    monkeypatch.setattr(runner_module.settings, "OPENAI_USE_PREVIOUS_RESPONSE_ID", True)
+    monkeypatch.setattr(runner_module, "_execute_tool", lambda name, args: {"results": [{"id": "KB-001"}]})
+
+    module_output = asyncio.run(runner_module.run_task("tell me about crm"))
+
+    assert module_output["final_answer"] == "raw answer"
+    assert module_output["tool_calls"][0]["arguments"] == {"query": "crm"}
+    assert bodies[0]["stream"] is True
+    assert bodies[0]["tools"] == runner_module._TOOLS
+    assert bodies[0]["input"][0] == runner_module._SYSTEM_MESSAGE
+    assert bodies[1]["previous_response_id"] == "resp_1"
+    assert [m["type"] for m in bodies[1]["input"]] == ["function_call_output"]
+    assert headers[0]["authorization"] == "Bearer test-key"
+    assert headers[0]["openai-organization"] == "org-test"
+    assert headers[0]["openai-project"] == "proj-test"
+    assert headers[0]["accept"] == "text/event-stream"
+    assert headers[0]["content-type"] == "application/json"
+
+
+@pytest.mark.parametrize("raw_http", [False, True])
+def test_run_task_returns_partial_answer_for_incomplete_turn(runner_module, monkeypatch, raw_http):
+    import httpx
+    from openai import AsyncOpenAI
+
+    in_progress = {
+        "id": "resp_1", "object": "response", "created_at": 0, "model": "test-model", "output": [],
+        "parallel_tool_calls": True, "tool_choice": "auto", "tools": [], "status": "in_progress",
+    }
+    message = {
+        "type": "message", "id": "msg_1", "role": "assistant", "status": "incomplete",
+        "content": [{"type": "output_text", "text": "partial answer", "annotations": []}],
+    }
+    incomplete = {
+        **in_progress, "status": "incomplete", "output": [message],
+        "incomplete_details": {"reason": "max_output_tokens"},
+    }
+    events = [
+        {"type": "response.created", "sequence_number": 0, "response": in_progress},
+        {"type": "response.output_item.added", "sequence_number": 1, "output_index": 0, "item": {**message, "content": []}},
+        {"type": "response.output_item.done", "sequence_number": 2, "output_index": 0, "item": message},
+        {"type": "response.incomplete", "sequence_number": 3, "response": incomplete},
+    ]
+
+    def handler(request):
+        sse = "".join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in events)
+        return httpx.Response(200, text=sse, headers={"content-type": "text/event-stream"})
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(runner_module, "_http_client", http_client)
+    monkeypatch.setattr(runner_module, "_client", AsyncOpenAI(api_key="test-key", http_client=http_client))
+    monkeypatch.setattr(runner_module.settings, "OPENAI_RAW_HTTP", raw_http)
+
+    module_output = asyncio.run(runner_module.run_task("tell me about crm"))
+
+    assert module_output["final_answer"] == "partial answer"
+    assert module_output["metrics"]["openai_calls"] == 1
+
+
+def test_run_task_side_effecting_tool_does_not_start_before_turn_completes(runner_module, monkeypatch):
+    import httpx
+    from openai import APIConnectionError
+
+    class _FailingStream(_MockStream):
+        async def _events(self):
+            await asyncio.sleep(0)
+            for item in self._response.output:
+                yield SimpleNamespace(type="response.output_item.done", item=item)
+                # give an early-started tool the chance to run
+                await asyncio.sleep(0.05)
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+
+    class _FailingResponses(_MockResponses):
+        def stream(self, **kwargs):
+            self.calls.append(kwargs)
+            return _FailingStream(self._sequence.pop(0))
+
+    test_client = _MockOpenAIClient(sequence=[])
+    test_client.responses = _FailingResponses(sequence=[
+        SimpleNamespace(output=[
+            _call("call_1", "search_kb", {"query": "crm"}),
+            _call("call_2", "create_ticket", {"title": "t", "body": "b", "priority": "high"}),
+        ]),
+    ])
+    executed = []
+
+    monkeypatch.setattr(runner_module, "AsyncOpenAI", lambda **kwargs: test_client)
+    monkeypatch.setattr(
+        runner_module,
+        "_execute_tool",
+        lambda name, args: executed.append(name) or {},
+    )
+
+    with pytest.raises(runner_module.UpstreamModelError):
+        asyncio.run(runner_module.run_task("open a ticket"))
+    # the read-only search may start early; the ticket is never created for a failed turn
+    assert executed == ["search_kb"]
+
+
+@pytest.mark.parametrize("sse", [
+    # stream cut off before the terminal event
+    'event: response.created\ndata: {"type": "response.created", "response": {"id": "resp_1"}}\n\n',
+    # data line that is not JSON
+    "event: response.created\ndata: {not json\n\n",
+])
+def test_run_task_raw_http_malformed_stream_is_upstream_error(runner_module, monkeypatch, sse):
+    import httpx
+    from openai import AsyncOpenAI
+
+    def handler(request):
+        return httpx.Response(200, text=sse, headers={"content-type": "text/event-stream"})
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(runner_module, "_http_client", http_client)
+    monkeypatch.setattr(runner_module, "_client", AsyncOpenAI(api_key="test-key", http_client=http_client))
+    monkeypatch.setattr(runner_module.settings, "OPENAI_RAW_HTTP", True)
+
+    with pytest.raises(runner_module.UpstreamModelError):
+        asyncio.run(runner_module.run_task("tell me about crm"))
@@ -6,7 +6,7 @@ from pathlib import Path
 import src.app.core.config as config
 
 @pytest.fixture()
-def search_kb_module(monkeypatch):
+def search_kb_module(monkeypatch, tmp_path):
     kb_path = Path(__file__).resolve().parent / "test_kb_db" / "test_kb.json"
     monkeypatch.setenv("KB_PATH", str(kb_path))
     monkeypatch.setenv("KB_TOP_K_DEFAULT", "3")
@@ -15,8 +15,9 @@ def search_kb_module(monkeypatch):
 
     m = importlib.import_module("src.tools.search_kb")
     m = importlib.reload(m)
-    m._KB_INDEX = None
-    m._KB_MTIME = None
+    m._INDEX_SIDECAR_PATH = tmp_path / "test_kb.index.json"
+    m._KB_KEY = None
+    m._kb_index_for.cache_clear()
 
     return m
 
@@ -97,3 +98,99 @@ def test_troubleshooting_hint_boost(search_kb_module):
     assert res["results"][0]["id"] == "KB-002"
     assert "SMTP" in res["results"][0]["snippet"]
 
+
+
+def test_search_without_shared_tokens_returns_no_results(search_kb_module):
+    # Stopwords only / unknown tokens produce no postings hits
+    assert search_kb_module.search_kb("the of and")["results"] == []
+    assert search_kb_module.search_kb("zzzunknownzzz")["results"] == []
+
+
+def test_index_sidecar_is_reused_and_invalidated(monkeypatch, tmp_path):
+    kb_path = tmp_path / "kb.json"
+    kb_path.write_bytes((Path(__file__).resolve().parent / "test_kb_db" / "test_kb.json").read_bytes())
+    monkeypatch.setenv("KB_PATH", str(kb_path))
+    config.get_settings.cache_clear()
+
+    m = importlib.reload(importlib.import_module("src.tools.search_kb"))
+    expected = m.search_kb("crm integration", top_k=2)
+    assert (tmp_path / "kb.index.json").exists()
+
+    # warm start: a fresh process state loads the sidecar without rebuilding
+    m._KB_KEY = None
+    m._kb_index_for.cache_clear()
+    monkeypatch.setattr(m, "_build_kb_index", lambda: pytest.fail("index should come from the sidecar"))
+    assert m.search_kb("crm integration", top_k=2) == expected
+
+    # KB changed: the sidecar tag no longer matches, so the index is rebuilt
+    monkeypatch.undo()
+    monkeypatch.setenv("KB_PATH", str(kb_path))
+    kb = json.loads(kb_path.read_text(encoding="utf-8"))
+    kb.append({"id": "KB-999", "title": "Zebra", "tags": [], "audience": "customer", "content": "zebra"})
+    kb_path.write_text(json.dumps(kb), encoding="utf-8")
+    m._KB_KEY = None
+    m._kb_index_for.cache_clear()
+    assert [r["id"] for r in m.search_kb("zebra")["results"]] == ["KB-999"]
+
+    config.get_settings.cache_clear()
+
+
+def test_index_sidecar_is_invalidated_by_tokenizer_changes(search_kb_module, monkeypatch):
+    m = search_kb_module
+    assert [r["id"] for r in m.search_kb("hubspot")["results"]]
+    assert m._INDEX_SIDECAR_PATH.exists()
+
+    # a code change to the synonym table alters the tokens baked into the cached postings
+    monkeypatch.setitem(m._NORMALIZE, "hubspot", "hubspot")
+    monkeypatch.setattr(m, "_INDEX_FINGERPRINT", m._index_fingerprint())
+    m._KB_KEY = None
+    m._kb_index_for.cache_clear()
+
+    rebuilt = []
+    build = m._build_kb_index
+    monkeypatch.setattr(m, "_build_kb_index", lambda: rebuilt.append(True) or build())
+    m.search_kb("hubspot")
+    assert rebuilt == [True]
+
+
+def test_index_sidecar_is_plain_json_and_stale_tags_are_rebuilt(search_kb_module, monkeypatch):
+    m = search_kb_module
+    expected = m.search_kb("crm integration", top_k=2)
+
+    tag_line, body = m._INDEX_SIDECAR_PATH.read_bytes().split(b"\n", 1)
+    assert json.loads(tag_line) == [m._INDEX_FORMAT_VERSION, m._INDEX_FINGERPRINT, *m._KB_KEY]
+    assert set(json.loads(body)) == {"entries", "postings"}
+
+    # a sidecar with another tag is rejected before its body is read
+    m._INDEX_SIDECAR_PATH.write_bytes(json.dumps([0, "stale", 0, 0]).encode() + b"\nnot json")
+    m._KB_KEY = None
+    m._kb_index_for.cache_clear()
+    rebuilt = []
+    build = m._build_kb_index
+    monkeypatch.setattr(m, "_build_kb_index", lambda: rebuilt.append(True) or build())
+    assert m.search_kb("crm integration", top_k=2) == expected
+    assert rebuilt == [True]
+
+
+def test_kb_change_is_picked_up_after_stat_ttl(monkeypatch, tmp_path):
+    kb_path = tmp_path / "kb.json"
+    kb_path.write_text(json.dumps([
+        {"id": "KB-1", "title": "Alpha", "tags": [], "audience": "customer", "content": "alpha"},
+    ]), encoding="utf-8")
+    monkeypatch.setenv("KB_PATH", str(kb_path))
+    config.get_settings.cache_clear()
+
+    m = importlib.reload(importlib.import_module("src.tools.search_kb"))
+    assert [r["id"] for r in m.search_kb("alpha")["results"]] == ["KB-1"]
+
+    kb_path.write_text(json.dumps([
+        {"id": "KB-2", "title": "Alpha two", "tags": [], "audience": "customer", "content": "alpha"},
+    ]), encoding="utf-8")
+
+    # within the TTL the cached index is served without a stat()
+    assert [r["id"] for r in m.search_kb("alpha")["results"]] == ["KB-1"]
+
+    m._last_stat_check -= m._STAT_TTL + 1
+    assert [r["id"] for r in m.search_kb("alpha")["results"]] == ["KB-2"]
+
+    config.get_settings.cache_clear()
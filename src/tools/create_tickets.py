@@ -1,9 +1,12 @@
-import json
-import threading
+import atexit
 from enum import Enum
 from typing import Any, Dict
 from pathlib import Path
 
+from src.app.utils import serialization
+from src.app.utils.counter import ReservedCounter
+from src.app.utils.files import AppendOnlyFile
+
 
 class TicketPriority(str, Enum):
     low = "low"
@@ -14,33 +17,26 @@ class TicketPriority(str, Enum):
 _TICKET_OUTPUT_PATH = Path(__file__).parent.parent.parent / "tickets.jsonl"
 _TICKET_COUNTER_PATH = Path(__file__).parent.parent.parent / "ticket_counter.txt"
 
-_LOCK = threading.Lock() # handles logic Counter in case of concurrent ticket creation
+# reserve ticket ids in blocks of N in the counter file
+_COUNTER_BLOCK_SIZE = 10
+
+# Ticket ids are issued from memory in blocks reserved in the counter file (see ReservedCounter),
+# so a hard crash skips at most _COUNTER_BLOCK_SIZE - 1 ids and never reissues one.
+_COUNTER = ReservedCounter(_TICKET_COUNTER_PATH, "ticket", _COUNTER_BLOCK_SIZE)
+_TICKETS_FILE = AppendOnlyFile(_TICKET_OUTPUT_PATH)
 
 
 # ---------------------
 # Helper functions & models
 # ---------------------
-def _load_counter() -> int:
-    if not _TICKET_COUNTER_PATH.exists():
-        return 0
-    raw = _TICKET_COUNTER_PATH.read_text(encoding="utf-8").strip()
-    if not raw:
-        return 0
-    try:
-        return int(raw)
-    except ValueError:
-        raise ValueError("Invalid ticket counter file content")
-
-
-def _save_counter(counter: int) -> None:
-    _TICKET_COUNTER_PATH.write_text(str(counter), encoding="utf-8")
+def _get_next_ticket_id() -> str:
+    return f"TICK-{_COUNTER.next():06d}"
 
 
-def _get_next_ticket_id() -> str:
-    with _LOCK:
-        counter = _load_counter() + 1
-        _save_counter(counter)
-        return f"TICK-{counter:06d}"
+@atexit.register
+def _shutdown() -> None:
+    _COUNTER.close()
+    _TICKETS_FILE.close()
 
 
 # ---------------------
@@ -68,10 +64,7 @@ def create_ticket(
         "priority": pr.value,
         "status": "created"
     }
-    # append to tickets file
-    line = json.dumps(ticket, ensure_ascii=False) + "\n"
-    with _LOCK:
-        with _TICKET_OUTPUT_PATH.open("a", encoding="utf-8") as f:
-            f.write(line)
+    # append to tickets file: O_APPEND puts each line at the end of the file, so no lock is needed
+    _TICKETS_FILE.append(serialization.dumps_bytes(ticket) + b"\n")
     
     return {"ticket_id": ticket_id, "status": "created"}
\ No newline at end of file
@@ -1,10 +1,19 @@
-import json
+import atexit
+import queue
+import re
 import threading
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 from datetime import datetime
 
+from src.app.utils import serialization
+from src.app.utils.counter import ReservedCounter
+from src.app.utils.files import AppendOnlyFile
+from src.app.utils.logger import get_logger
+
+logger = get_logger("tools.followup")
+
 
 class FollowupChannel(str, Enum):
     email = "email"
@@ -15,33 +24,99 @@ class FollowupChannel(str, Enum):
 _FOLLOWUP_OUTPUT_PATH = Path(__file__).parent.parent.parent / "followups.jsonl"
 _FOLLOEUP_COUNTER_PATH = Path(__file__).parent.parent.parent / "followup_counter.txt"
 
-_LOCK = threading.Lock() # handles logic Counter in case of concurrent followup creation
+_LOCK = threading.Lock() # guards starting the writer
+
+# followup ids are reserved in blocks of N in the counter file, same scheme as tickets
+_COUNTER_BLOCK_SIZE = 10
+_COUNTER = ReservedCounter(_FOLLOEUP_COUNTER_PATH, "followup", _COUNTER_BLOCK_SIZE)
+_FOLLOWUPS_FILE = AppendOnlyFile(_FOLLOWUP_OUTPUT_PATH)
+
+# Followup lines are appended by a single background writer: schedule_followup only enqueues,
+# and the writer joins whatever has queued up into one write() per batch. None stops the writer.
+# A failed write keeps its lines and is retried every _RETRY_DELAY seconds, ahead of newer lines.
+_write_q: "queue.Queue[Optional[bytes]]" = queue.Queue()
+_writer: Optional[threading.Thread] = None
+_RETRY_DELAY = 1.0
 
 
 # ---------------------
 # Helper functions
 # ---------------------
-def _load_counter() -> int:
-    if not _FOLLOEUP_COUNTER_PATH.exists():
-        return 0
-    raw = _FOLLOEUP_COUNTER_PATH.read_text(encoding="utf-8").strip()
-    if not raw:
-        return 0
-    try:
-        return int(raw)
-    except ValueError:
-        raise ValueError("Invalid followup counter file content")
-    
-
-def _save_counter(counter: int) -> None:
-    _FOLLOEUP_COUNTER_PATH.write_text(str(counter), encoding="utf-8")
-
-
 def _get_next_followup_id() -> str:
-    with _LOCK:
-        counter = _load_counter() + 1
-        _save_counter(counter)
-        return f"FUP-{counter:06d}"
+    return f"FUP-{_COUNTER.next():06d}"
+
+
+def _writer_loop() -> None:
+    get, get_nowait, task_done = _write_q.get, _write_q.get_nowait, _write_q.task_done
+    # lines taken off the queue but not written yet; kept and retried after a failed write
+    pending: List[bytes] = []
+    while True:
+        # block for the first line (waking up to retry if failed lines are waiting), then take
+        # everything else already queued
+        try:
+            batch = [get(timeout=_RETRY_DELAY if pending else None)]
+        except queue.Empty:
+            batch = []
+        while batch and batch[-1] is not None:
+            try:
+                batch.append(get_nowait())
+            except queue.Empty:
+                break
+
+        stop = bool(batch) and batch[-1] is None
+        if stop:
+            batch.pop()
+            task_done()
+        pending.extend(batch)
+
+        if pending:
+            try:
+                _FOLLOWUPS_FILE.append(b"".join(pending))
+            except OSError:
+                if not stop:
+                    logger.exception("failed to write %d followup line(s), retrying", len(pending))
+                    continue
+                # last chance at shutdown: log the lines themselves so they can be recovered
+                logger.exception("dropping %d unwritten followup line(s) at shutdown", len(pending))
+                for line in pending:
+                    logger.error("unwritten followup: %s", line.decode("utf-8").rstrip())
+            for _ in pending:
+                task_done()
+            pending.clear()
+
+        if stop:
+            return
+
+
+def _enqueue_line(line: bytes) -> None:
+    global _writer
+    if _writer is None:
+        with _LOCK:
+            if _writer is None:
+                _writer = threading.Thread(target=_writer_loop, name="followup-writer", daemon=True)
+                _writer.start()
+    _write_q.put(line)
+
+
+@atexit.register
+def _shutdown() -> None:
+    # drain the queued followups before closing the file
+    if _writer is not None:
+        _write_q.put(None)
+        _writer.join()
+    _COUNTER.close()
+    _FOLLOWUPS_FILE.close()
+
+
+# Strings already in datetime.isoformat() form that fromisoformat() is sure to accept, so they
+# are returned as they are. Days 29-31, a zero fraction and "-00:00" are left to fromisoformat(),
+# which validates the month length or rewrites them.
+_ISO_RE = re.compile(
+    r"(?!0000)[0-9]{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|1[0-9]|2[0-8])"
+    r"T(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]"
+    r"(?:\.(?!0{6})[0-9]{6})?"
+    r"(?:\+(?:[01][0-9]|2[0-3]):[0-5][0-9]|-(?!00:00)(?:[01][0-9]|2[0-3]):[0-5][0-9])?"
+)
 
 
 def _validate_iso8601(date_str: str) -> str:
@@ -52,6 +127,9 @@ def _validate_iso8601(date_str: str) -> str:
 
     if s.endswith("Z"):
         s = s[:-1] + "+00:00"
+
+    if _ISO_RE.fullmatch(s):
+        return s
     
     try:
         parsed = datetime.fromisoformat(s)
@@ -91,10 +169,7 @@ def schedule_followup(
         "status": True,
     }
 
-    # append to followups file
-    line = json.dumps(followup, ensure_ascii=False) + "\n"
-    with _LOCK:
-        with _FOLLOWUP_OUTPUT_PATH.open("a", encoding="utf-8") as f:
-            f.write(line)
+    # append to followups file in the background; the id is already assigned, so there is nothing to wait for
+    _enqueue_line(serialization.dumps_bytes(followup) + b"\n")
     
     return {"scheduled": True, "followup_id": followup_id}
\ No newline at end of file
@@ -1,23 +1,29 @@
 from __future__ import annotations
 
-import json
+import hashlib
+import heapq
+import os
 import re
+import tempfile
+import time
 
 from collections import Counter
 from dataclasses import dataclass
-from typing import List, Optional, Any, Dict, Tuple
+from functools import lru_cache
+from typing import List, Optional, Any, Dict, FrozenSet, Pattern, Tuple
 from pathlib import Path
 
 from src.app.core.config import get_settings
+from src.app.utils import serialization
 
 # Regular expression to tokenize text into words (alphanumeric sequences)
 _TOKEN_RE = re.compile(r"[a-z0-9]+", re.IGNORECASE)
 _BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
-_TROUBLESHOOTING_HINTS = {
+_TROUBLESHOOTING_HINTS = frozenset({
     "troubleshoot", "troubleshooting", "failed", "failure", "error", "issue", "incident",
     "broken", "not", "working", "timeout", "rate", "limit", "complaint", "degraded"
-}
+})
 
 _STOPWORDS = {
     "a", "an", "the", "to", "and", "or", "of", "in", "on", "for",
@@ -35,9 +41,18 @@ _SYNONYMS = {
     "failure": "failed",
 }
 
-_ESCALATION_HINTS = {
+_ESCALATION_HINTS = frozenset({
     "ticket", "high", "high_priority", "priority", "operations", "incident", "production", "escalate", "escalation"
-}
+})
+
+# Single lookup table for _tokenize: synonym -> canonical form, stopword (or synonym of one) -> None
+_NORMALIZE: Dict[str, Optional[str]] = {w: None for w in _STOPWORDS}
+_NORMALIZE.update({src: (None if dst in _STOPWORDS else dst) for src, dst in _SYNONYMS.items()})
+
+# Keyword score weights per occurrence of a query token: title hit, tag hit, content hit
+_TITLE_WEIGHT = 5
+_TAG_WEIGHT = 3
+_CONTENT_WEIGHT = 1
 
 settings = get_settings()
 
@@ -56,19 +71,11 @@ _DB_PATH = _resolve_db_path()
 # Helper functions & models
 # ---------------------
 def _tokenize(text: str) -> List[str]:
-    toks = _TOKEN_RE.findall((text or "").lower())
-    out: List[str] = []
-
-    for t in toks:
-        t = _SYNONYMS.get(t, t)
-        if t in _STOPWORDS:
-            continue
-        out.append(t)
-    
-    return out
+    normalize = _NORMALIZE.get
+    return [v for v in (normalize(t, t) for t in _TOKEN_RE.findall((text or "").lower())) if v is not None]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class KBEntry:
     id: str
     title: str
@@ -89,77 +96,189 @@ class KBEntry:
         )
 
 
-@dataclass(frozen=True)
+# Normalized forms of a KBEntry, computed once by _index_entry; search code reads these and
+# never lowercases or strips entry fields itself.
+@dataclass(frozen=True, slots=True)
 class _IndexedEntry:
     entry: KBEntry
-    title_tf: Counter[str]
-    content_tf: Counter[str]
-    tags_lc: List[str]
+    title_lc: str
+    tags_set: FrozenSet[str]
     audience_lc: str
+    content_stripped: str
+    content_lc: str  # lowercased content_stripped, for snippet matching
+
+
+# Cache KB in memory: the built index is memoized by the KB file's (mtime_ns, size), and the file is
+# stat()ed at most once per _STAT_TTL seconds, so a hot KB costs no syscalls per query.
+# Postings map each token (title/content token or lowercased tag) to the (entry position, weight)
+# pairs of the entries containing it, in KB order; see _build_kb_index for the weight.
+_STAT_TTL = 1.0
+_KB_KEY: Optional[Tuple[int, int]] = None
+_last_stat_check = 0.0
 
 
-# Cache KB in memory
-_KB_INDEX: Optional[List[_IndexedEntry]] = None
-_KB_MTIME: Optional[float] = None
+# Built index is persisted next to the KB (kb.json -> kb.index.json) so warm starts skip tokenization.
+# The sidecar is plain JSON: a first line with the tag (this version, a fingerprint of the tokenizer
+# tables and score weights baked into the postings, and the KB's mtime/size), then the entries' raw
+# fields and the postings. Nothing is executed on load, and a stale tag is rejected before the rest
+# is parsed. Bump the version whenever the sidecar layout or the indexing code changes.
+_INDEX_FORMAT_VERSION = 6
 
 
-def _load_kb_index() -> List[_IndexedEntry]:
-    global _KB_INDEX, _KB_MTIME
+def _index_fingerprint() -> str:
+    material = (
+        _TOKEN_RE.pattern,
+        _TOKEN_RE.flags,
+        sorted(_NORMALIZE.items()),
+        (_TITLE_WEIGHT, _TAG_WEIGHT, _CONTENT_WEIGHT),
+    )
+    return hashlib.sha256(repr(material).encode("utf-8")).hexdigest()
 
-    mtime = _DB_PATH.stat().st_mtime
-    if _KB_INDEX is not None and _KB_MTIME == mtime:
-        return _KB_INDEX
 
-    raw = json.loads(_DB_PATH.read_text(encoding="utf-8"))
+_INDEX_FINGERPRINT = _index_fingerprint()
+_INDEX_SIDECAR_PATH = _DB_PATH.with_suffix(".index.json")
+
+_SidecarTag = Tuple[int, str, int, int]
+
+
+def _index_entry(entry: KBEntry) -> _IndexedEntry:
+    content_stripped = entry.content.strip()
+    return _IndexedEntry(
+        entry=entry,
+        title_lc=entry.title.lower(),
+        tags_set=frozenset(str(tag).lower() for tag in entry.tags),
+        audience_lc=(entry.audience or "").lower(),
+        content_stripped=content_stripped,
+        content_lc=content_stripped.lower(),
+    )
+
+
+def _build_kb_index() -> Tuple[List[_IndexedEntry], Dict[str, List[Tuple[int, int]]]]:
+    # parse the raw UTF-8 bytes directly, no intermediate str
+    raw = serialization.loads(_DB_PATH.read_bytes())
     entries = [KBEntry.from_dict(entry) for entry in raw]
 
     indexed: List[_IndexedEntry] = []
-    for entry in entries:
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for idx, entry in enumerate(entries):
         title_tf = Counter(_tokenize(entry.title))
         content_tf = Counter(_tokenize(entry.content))
-        tags_lc = [str(tag).lower() for tag in entry.tags]
-        audience_lc = (entry.audience or "").lower()
-
-        indexed.append(_IndexedEntry(
-            entry=entry,
-            title_tf=title_tf,
-            content_tf=content_tf,
-            tags_lc=tags_lc,
-            audience_lc=audience_lc,
-        ))
-    
-    _KB_INDEX = indexed
-    _KB_MTIME = mtime
-    return indexed
+        tags_tf = Counter(str(tag).lower() for tag in entry.tags)
+        indexed.append(_index_entry(entry))
+
+        # Keyword score weights, folded per token at index time: each field's weight times
+        # the token's occurrences in that field
+        for token in title_tf.keys() | content_tf.keys() | tags_tf.keys():
+            weight = (
+                _TITLE_WEIGHT * title_tf[token]
+                + _TAG_WEIGHT * tags_tf[token]
+                + _CONTENT_WEIGHT * content_tf[token]
+            )
+            postings.setdefault(token, []).append((idx, weight))
+
+    return indexed, postings
+
+
+def _read_index_sidecar(
+    tag: _SidecarTag
+) -> Optional[Tuple[List[_IndexedEntry], Dict[str, List[Tuple[int, int]]]]]:
+    try:
+        data = _INDEX_SIDECAR_PATH.read_bytes()
+        tag_line, _, body = data.partition(b"\n")
+        if serialization.loads(tag_line) != list(tag):
+            return None
+
+        stored = serialization.loads(body)
+        indexed = [
+            _index_entry(KBEntry(
+                id=id_, title=title, tags=tags, audience=audience, last_updated=last_updated, content=content,
+            ))
+            for id_, title, tags, audience, last_updated, content in stored["entries"]
+        ]
+        postings = {
+            token: [(idx, weight) for idx, weight in plist] for token, plist in stored["postings"].items()
+        }
+    except Exception:
+        # missing, unreadable or malformed: rebuild
+        return None
+    return indexed, postings
+
+
+def _write_index_sidecar(
+    tag: _SidecarTag, indexed: List[_IndexedEntry], postings: Dict[str, List[Tuple[int, int]]]
+) -> None:
+    tmp_name: Optional[str] = None
+    try:
+        # a unique temp file per writer: concurrent searches run in worker threads of one process
+        with tempfile.NamedTemporaryFile(
+            dir=_INDEX_SIDECAR_PATH.parent, prefix=f"{_INDEX_SIDECAR_PATH.name}.", suffix=".tmp", delete=False
+        ) as tmp:
+            tmp_name = tmp.name
+            tmp.write(serialization.dumps_bytes(list(tag)) + b"\n")
+            tmp.write(serialization.dumps_bytes({
+                "entries": [
+                    [e.id, e.title, e.tags, e.audience, e.last_updated, e.content]
+                    for e in (idx_entry.entry for idx_entry in indexed)
+                ],
+                "postings": postings,
+            }))
+        os.replace(tmp_name, _INDEX_SIDECAR_PATH)
+    except Exception:
+        # the sidecar is only a cache; a read-only KB directory just means cold starts rebuild
+        if tmp_name is not None:
+            Path(tmp_name).unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=1)
+def _kb_index_for(kb_key: Tuple[int, int]) -> Tuple[List[_IndexedEntry], Dict[str, List[Tuple[int, int]]]]:
+    tag = (_INDEX_FORMAT_VERSION, _INDEX_FINGERPRINT, *kb_key)
+    loaded = _read_index_sidecar(tag)
+    if loaded is None:
+        loaded = _build_kb_index()
+        _write_index_sidecar(tag, *loaded)
+    return loaded
+
+
+def _load_kb_index() -> Tuple[List[_IndexedEntry], Dict[str, List[Tuple[int, int]]]]:
+    global _KB_KEY, _last_stat_check
+
+    now = time.monotonic()
+    if _KB_KEY is None or now - _last_stat_check > _STAT_TTL:
+        stat = _DB_PATH.stat()
+        _KB_KEY = (stat.st_mtime_ns, stat.st_size)
+        _last_stat_check = now
+
+    return _kb_index_for(_KB_KEY)
 
-        
 
 # ---------------------
 # Core functions
 # ---------------------
-def _build_snippet(content: str, query_tokens: List[str], snippet_length: int = 220) -> str:
+def _build_snippet(
+    indexed_entry: _IndexedEntry, query_pattern: Optional[Pattern[str]], snippet_length: int = 220
+) -> str:
     """
-    Build a short snippet from content.
+    Build a short snippet from the entry content, using the normalized forms cached at index time.
+    query_pattern matches any query token (see _query_pattern), or is None for a token-less query.
     """
-    if not content:
+    c = indexed_entry.content_stripped
+    if not c:
         return ""
     
-    c = content.strip()
-    if not query_tokens:
+    if query_pattern is None:
         # if no query tokens, just return the start of the content
         return c[:snippet_length] + ("..." if len(c) > snippet_length else "")
     
     
-    lower_c = c.lower()
-    positions = [lower_c.find(t) for t in set(query_tokens)]
-    positions = [p for p in positions if p >= 0]
+    # one scan for the leftmost occurrence of any token
+    match = query_pattern.search(indexed_entry.content_lc)
 
-    if not positions:
+    if match is None:
         # if no query tokens found, return the start of the content
         return c[:snippet_length] + ("..." if len(c) > snippet_length else "")
 
     # Build snippet around the first match
-    first_pos = min(positions)
+    first_pos = match.start()
     start = max(0, first_pos - snippet_length // 2)
     end = min(len(c), start + snippet_length)
     snippet = c[start:end].strip()
@@ -172,58 +291,45 @@ def _build_snippet(content: str, query_tokens: List[str], snippet_length: int =
     return snippet
 
 
-def _score_entry(indexed_entry: _IndexedEntry, query_tokens: Counter[str]) -> int:
+def _query_pattern(query_tokens: Tuple[str, ...]) -> Optional[Pattern[str]]:
     """
-    simple keyword matching score:
-    - title token hit: +5
-    - tag hit: +3
-    - content token hit: +1
-    Also counts multiple occurrences in content/title via .count.
+    Alternation of the (already lowercased) query tokens. Plain substring alternatives, so the
+    leftmost match is the same as the smallest str.find() position over all tokens.
     """
-    score = 0
-    tags = indexed_entry.tags_lc
+    if not query_tokens:
+        return None
+    return re.compile("|".join(map(re.escape, dict.fromkeys(query_tokens))))
 
-    for t, query_count in query_tokens.items():
-        score += query_count * (5 * indexed_entry.title_tf.get(t, 0))
-        score += query_count * (3 * tags.count(t))
-        score += query_count * (indexed_entry.content_tf.get(t, 0))
 
-    return score
+@lru_cache(maxsize=512)
+def _prepare_query(query: str) -> Tuple[Tuple[str, ...], FrozenSet[str], Dict[str, int]]:
+    """
+    Tokens, distinct tokens and token counts of a query. Memoized so repeated queries (retries,
+    the model re-asking) skip tokenization; callers must not mutate the returned dict.
+    """
+    query_tokens = tuple(_tokenize(query))
+    query_tf: Dict[str, int] = {}
+    for t in query_tokens:
+        query_tf[t] = query_tf.get(t, 0) + 1
+    return query_tokens, frozenset(query_tf), query_tf
 
 
-def _soft_preference_bonus(
-    indexed_entry: _IndexedEntry,
-    query_tokens: List[str],
-    filters: Optional[Dict[str, Any]],
-) -> int:
+def _score_candidates(postings: Dict[str, List[Tuple[int, int]]], query_tf: Dict[str, int]) -> Dict[int, int]:
     """
-    Soft preference boosts to improve robustness when the model sends imperfect filters.
+    simple keyword matching score, accumulated term-at-a-time over the postings:
+    - title token hit: +5
+    - tag hit: +3
+    - content token hit: +1
+    Each hit is weighted by its count in the query times its count in the field.
+    Returns entry position -> score for every entry sharing a token with the query.
     """
-    bonus_score = 0
-    query_set = set(query_tokens)
+    scores: Dict[int, int] = {}
+    postings_get, scores_get = postings.get, scores.get
+    for t, query_count in query_tf.items():
+        for idx, weight in postings_get(t, ()):
+            scores[idx] = scores_get(idx, 0) + query_count * weight
 
-    if query_set & _TROUBLESHOOTING_HINTS:
-        if indexed_entry.audience_lc == "internal":
-            bonus_score += 2
-    
-    if query_set & _ESCALATION_HINTS:
-        if "operations" in indexed_entry.tags_lc or "escalation" in indexed_entry.entry.title.lower():
-            bonus_score += 2
-    
-    if not filters:
-        return bonus_score
-    
-    audience_req = str(filters.get("audience", "")).strip().lower()
-    if audience_req and indexed_entry.audience_lc == audience_req:
-        bonus_score += 2
-    
-    tags_req = filters.get("tags", [])
-    if tags_req:
-        need = {tag.lower() for tag in tags_req if str(tag).strip()}
-        have = {tag.lower() for tag in indexed_entry.tags_lc}
-        bonus_score += len(need & have)
-    
-    return bonus_score
+    return scores
 
 
 # ---------------------
@@ -243,34 +349,57 @@ def search_kb(query: str, top_k: Optional[int] = None, filters: Optional[Dict[st
     if not isinstance(query, str) or not query.strip():
         raise ValueError("query must be a non-empty string")
     
-    query_tokens = _tokenize(query)
-    query_tf = Counter(query_tokens)
+    query_tokens, query_set, query_tf = _prepare_query(query)
 
-    kb_index = _load_kb_index()
+    kb_index, postings = _load_kb_index()
 
     effective_top_k = int(top_k) if top_k is not None else settings.KB_TOP_K_DEFAULT
     effective_top_k = max(1, min(effective_top_k, 10))  # cap at 10
     scored_entries: List[Tuple[_IndexedEntry, int]] = []
 
-    for idx_entry in kb_index:
-        base = _score_entry(idx_entry, query_tf)
-        if base == 0:
-            continue
-        
-        score = base + _soft_preference_bonus(idx_entry, query_tokens, filters)
-        scored_entries.append((idx_entry, score))
+    # Soft preference boosts to improve robustness when the model sends imperfect filters.
+    # Everything that depends only on the query and filters is decided once here.
+    troubleshooting = bool(query_set & _TROUBLESHOOTING_HINTS)
+    escalation = bool(query_set & _ESCALATION_HINTS)
+    audience_req = ""
+    need: FrozenSet[str] = frozenset()
+    if filters:
+        audience_req = str(filters.get("audience", "")).strip().lower()
+        tags_req = filters.get("tags", [])
+        if tags_req:
+            need = frozenset(tag.lower() for tag in tags_req if str(tag).strip())
+
+    # Only entries sharing a token with the query score above 0; visit them in KB order
+    # so ties keep the same ranking as a full scan
+    base_scores = _score_candidates(postings, query_tf)
+
+    append = scored_entries.append
+    for i in sorted(base_scores):
+        idx_entry = kb_index[i]
+        score = base_scores[i]
+        if troubleshooting and idx_entry.audience_lc == "internal":
+            score += 2
+        if escalation and ("operations" in idx_entry.tags_set or "escalation" in idx_entry.title_lc):
+            score += 2
+        if audience_req and idx_entry.audience_lc == audience_req:
+            score += 2
+        if need:
+            score += len(need & idx_entry.tags_set)
+        append((idx_entry, score))
     
-    # Sort by score, then most recent last_updated if present
-    scored_entries.sort(key=lambda x: (x[1], x[0].entry.last_updated or ""), reverse=True)
-    top_entries = scored_entries[:effective_top_k]
+    # Top k by score, then most recent last_updated if present (same order as a stable reverse sort)
+    top_entries = heapq.nlargest(
+        effective_top_k, scored_entries, key=lambda x: (x[1], x[0].entry.last_updated or "")
+    )
 
-    max_score = top_entries[0][1] if top_entries else 0.0
+    max_score: int = top_entries[0][1] if top_entries else 0
+    query_pattern = _query_pattern(query_tokens) if top_entries else None
     results: List[Dict[str, Any]] = []
 
     for idx_entry, score in top_entries:
         norm = (score / max_score) if max_score else 0.0
         entry = idx_entry.entry
-        snippet = _build_snippet(entry.content, query_tokens)
+        snippet = _build_snippet(idx_entry, query_pattern)
         results.append({
             "id": entry.id,
             "title": entry.title,